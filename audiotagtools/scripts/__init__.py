@@ -1,4 +1,7 @@
+from audiotagtools.scripts.backends import *
 from audiotagtools.scripts.strings import *
 from audiotagtools.scripts.files import *
 from audiotagtools.scripts.images import *
-from audiotagtools.scripts.sounds import *
\ No newline at end of file
+from audiotagtools.scripts.silence import *
+from audiotagtools.scripts.sounds import *
+from audiotagtools.scripts.bulk import *
\ No newline at end of file
@@ -0,0 +1,224 @@
+import logging
+import shutil
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from os import PathLike, mkdir
+from os.path import join, basename, splitext
+
+import click
+import eyed3
+import mutagen
+
+
+def id3_version(path: PathLike | str):
+    """
+    Returns the major version of a file's ID3v2 tag (e.g. 3 for ID3v2.3), or None if it has none.
+    Reads only the 10-byte tag header, since mutagen's "easy" interface does not expose the version.
+    :param path:
+    :return:
+    """
+    with open(path, 'rb') as f:
+        header = f.read(10)
+    return header[3] if len(header) == 10 and header.startswith(b'ID3') else None
+
+
+class TagBackend(ABC):
+    """
+    Reads and writes text tags of audio files. Subclasses wrap a specific tagging library.
+    """
+
+    name = None
+    extensions = ()
+
+    @abstractmethod
+    def load(self, path: PathLike | str):
+        """
+        Loads the tags of a file, returning an object to pass to the other methods, or None if the file has no tags
+        :param path:
+        :return:
+        """
+
+    @abstractmethod
+    def get(self, tags, tag: str, delimiter: str = '/'):
+        """
+        Returns the value of a tag as a single string, joining multiple values with the delimiter
+        :param tags: An object returned by load.
+        :param tag:
+        :param delimiter:
+        :return:
+        """
+
+    @abstractmethod
+    def set(self, tags, tag: str, value: str):
+        """
+        Replaces the value of a tag. Changes are kept in memory until save is called.
+        :param tags: An object returned by load.
+        :param tag:
+        :param value:
+        :return:
+        """
+
+    @abstractmethod
+    def save(self, tags):
+        """
+        Writes the tags back to their file, keeping the file's tag format and version
+        :param tags: An object returned by load.
+        :return:
+        """
+
+    def supports(self, name: str):
+        """
+        Checks whether a file name has an extension this backend can handle
+        :param name:
+        :return:
+        """
+        return name.lower().endswith(self.extensions)
+
+
+class Eyed3Backend(TagBackend):
+    """
+    Tags MP3 files with eyed3
+    """
+
+    name = 'eyed3'
+    extensions = ('.mp3',)
+
+    def load(self, path: PathLike | str):
+        audiofile = eyed3.load(path)
+        return audiofile.tag if audiofile else None
+
+    def get(self, tags, tag: str, delimiter: str = '/'):
+        value = getattr(tags, tag)
+        return str(value) if value else None
+
+    def set(self, tags, tag: str, value: str):
+        setattr(tags, tag, value)
+
+    def save(self, tags):
+        tags.save()
+
+
+class MutagenBackend(TagBackend):
+    """
+    Tags MP3 (ID3) and FLAC (Vorbis comment) files with mutagen's "easy" interface
+    """
+
+    name = 'mutagen'
+    extensions = ('.mp3', '.flac')
+
+    def load(self, path: PathLike | str):
+        audio = mutagen.File(path, easy=True)
+        if audio is not None and audio.tags is None:
+            audio.add_tags()
+        return audio
+
+    def get(self, tags, tag: str, delimiter: str = '/'):
+        values = tags.get(tag)
+        return delimiter.join(str(x) for x in values) if values else None
+
+    def set(self, tags, tag: str, value: str):
+        tags[tag] = value
+
+    def save(self, tags):
+        if tags.filename.lower().endswith('.mp3'):
+            # Keep the file's ID3 version; converting v2.4 to v2.3 drops frames such as TSOP and TSOA
+            tags.save(v2_version=3 if id3_version(tags.filename) == 3 else 4)
+        else:
+            tags.save()
+
+
+BACKENDS = {
+    'mutagen': MutagenBackend,
+    'eyed3': Eyed3Backend
+}
+
+
+def get_backend(backend: str | TagBackend = 'mutagen'):
+    """
+    Returns a backend instance, given its name or an instance
+    :param backend:
+    :return:
+    """
+    if isinstance(backend, TagBackend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown tag backend "{backend}". Options are {", ".join(BACKENDS)}.')
+    return BACKENDS[backend]()
+
+
+def time_backend(backend: TagBackend, files: list[str], repeat: int = 5, tag: str = 'genre'):
+    """
+    Times loading, reading a tag from, and saving the given files with a backend.
+    Returns (mean load seconds per file, mean save seconds per file).
+    :param backend:
+    :param files:
+    :param repeat:
+    :param tag:
+    :return:
+    """
+    load_time = save_time = 0.0
+    for _ in range(repeat):
+        for file in files:
+            start = time.perf_counter()
+            tags = backend.load(file)
+            if tags is not None:
+                backend.get(tags, tag)
+            load_time += time.perf_counter() - start
+            if tags is not None:
+                start = time.perf_counter()
+                backend.save(tags)
+                save_time += time.perf_counter() - start
+    count = repeat * len(files)
+    return load_time / count, save_time / count
+
+
+def benchmark_backends(files: list[PathLike | str], repeat: int = 5, tag: str = 'genre'):
+    """
+    Compares the per-file load and save cost of the backends.
+    Every backend is timed on the same files (those all backends support), each on its own fresh copies,
+    so one backend's saves cannot change what the next one loads. Files only some backends support
+    (e.g. FLAC for mutagen) are timed separately and reported as "<backend> (<EXT>)".
+    Returns a dict of label -> (mean load seconds per file, mean save seconds per file).
+    :param files:
+    :param repeat:
+    :param tag:
+    :return:
+    """
+    eyed3.log.setLevel(logging.ERROR)
+    backends = [cls() for cls in BACKENDS.values()]
+    files = [str(x) for x in files]
+    common = [x for x in files if all([b.supports(x) for b in backends])]
+    groups = [(b.name, b, common) for b in backends if common]
+    for backend in backends:
+        extra = [x for x in files if backend.supports(x) and x not in common]
+        for ext in sorted(set(splitext(x)[1].lower() for x in extra)):
+            label = f'{backend.name} ({ext.lstrip(".").upper()})'
+            groups.append((label, backend, [x for x in extra if x.lower().endswith(ext)]))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, (label, backend, targets) in enumerate(groups):
+            copy_dir = join(tmp, str(i))
+            mkdir(copy_dir)
+            copies = [shutil.copy(x, join(copy_dir, f'{j}_{basename(x)}')) for j, x in enumerate(targets)]
+            results[label] = time_backend(backend, copies, repeat, tag)
+    return results
+
+
+@click.command()
+@click.option('-r', '--repeat', default=5, show_default=True, help='Number of passes over the files.')
+@click.option('-t', '--tag', default='genre', show_default=True, help='Tag to read on each load.')
+@click.argument('files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def benchmark_backends_cli(files: tuple[str], repeat: int = 5, tag: str = 'genre'):
+    """
+    Command line tool for comparing the per-file load and save cost of the tag backends.
+    Works on temporary copies of the given files.
+    """
+    results = benchmark_backends(list(files), repeat, tag)
+    for name, (load_time, save_time) in results.items():
+        click.echo(f'{name}: load {load_time * 1000:.2f} ms/file, save {save_time * 1000:.2f} ms/file')
+
+
+if __name__ == '__main__':
+    pass
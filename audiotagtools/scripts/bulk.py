@@ -0,0 +1,331 @@
+import csv
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from os import PathLike, walk
+from os.path import abspath, exists, isdir, join, relpath, splitext
+
+import click
+import mutagen
+
+from audiotagtools.scripts.backends import MutagenBackend, id3_version
+from audiotagtools.scripts.strings import get_logger
+
+CSV_TAGS = [
+    'title',
+    'artist',
+    'album',
+    'albumartist',
+    'composer',
+    'genre',
+    'date',
+    'tracknumber',
+    'discnumber'
+]
+"""
+The tags written to CSV exports by default. JSONL exports contain every tag mutagen's "easy" interface maps:
+all Vorbis comments for FLAC files, but only the common EasyID3 keys for MP3 files.
+"""
+
+
+def find_audio_files(path: PathLike | str, filetypes: tuple[str] = ('mp3', 'flac')):
+    """
+    Searches the given directory and its subdirectories for audio files, ignoring hidden directories.
+    :param path:
+    :param filetypes:
+    :return:
+    """
+    path = abspath(path)
+    extensions = tuple('.' + x for x in filetypes)
+    for root, dirs, files in walk(path):
+        dirs[:] = sorted([x for x in dirs if not x.startswith('.')])  # Ignore hidden directories
+        for file in sorted(files):
+            if file.lower().endswith(extensions):
+                yield join(root, file)
+
+
+def read_tags(path: PathLike | str):
+    """
+    Reads the tags of an MP3 (ID3) or FLAC (Vorbis comment) file as a dict of lists.
+    MP3 files only report the frames EasyID3 maps to keys (e.g. TIT2 as "title"); other frames such as COMM
+    and TXXX are not read, and are left untouched by write_tags.
+    :param path:
+    :return:
+    """
+    audio = mutagen.File(path, easy=True)
+    if audio is None or audio.tags is None:
+        return {}
+    return {key: [str(x) for x in audio[key]] for key in sorted(audio.keys())}
+
+
+def write_tags(path: PathLike | str, tags: dict[str, list[str]]):
+    """
+    Applies tags to an MP3 or FLAC file. An empty list deletes the tag; tags not in "tags" are left alone.
+    Loads and saves the file once, and only saves if a value changed.
+    ID3v2.3 cannot store several values in one frame, so for v2.3 MP3 files they are joined with "/",
+    the way mutagen would store them, before comparing.
+    Returns True if the file was saved.
+    :param path:
+    :param tags:
+    :return:
+    """
+    backend = MutagenBackend()
+    audio = backend.load(path)
+    if audio is None:
+        raise ValueError(f'"{path}" is not a supported audio file.')
+    joined = str(path).lower().endswith('.mp3') and id3_version(path) == 3
+    changed = False
+    for key, values in tags.items():
+        if joined and len(values) > 1:
+            values = ['/'.join(values)]
+        current = [str(x) for x in audio[key]] if key in audio else []
+        if values == current:
+            continue
+        if values:
+            audio[key] = values
+        else:
+            del audio[key]
+        changed = True
+    if changed:
+        backend.save(audio)
+    return changed
+
+
+def encode_cell(values: list[str]):
+    """
+    Encodes the values of a tag for a CSV cell. A single value is written as is; several values,
+    or a value that would read back as a list, are written as a JSON list.
+    :param values:
+    :return:
+    """
+    if len(values) == 1 and decode_cell(values[0]) == values:
+        return values[0]
+    return json.dumps(values, ensure_ascii=False) if values else ''
+
+
+def decode_cell(cell: str):
+    """
+    Decodes a CSV cell written by encode_cell into a list of values
+    :param cell:
+    :return:
+    """
+    if not cell:
+        return []
+    if cell.startswith('['):
+        try:
+            values = json.loads(cell)
+        except ValueError:
+            return [cell]
+        if isinstance(values, list) and all([isinstance(x, str) for x in values]):
+            return values
+    return [cell]
+
+
+def detect_format(path: PathLike | str, fmt: str | None = None):
+    """
+    Returns "csv" or "jsonl", using the file extension if no format is given.
+    :param path:
+    :param fmt:
+    :return:
+    """
+    if fmt:
+        return fmt
+    return 'csv' if splitext(str(path))[1].lower() == '.csv' else 'jsonl'
+
+
+def export_tags(path: PathLike | str,
+                output: PathLike | str,
+                fmt: str | None = None,
+                tags: list[str] = None,
+                jobs: int = 4,
+                verbose: bool = False,
+                logger: logging.Logger = None):
+    """
+    Writes the tags of every MP3 and FLAC file in a library to a single JSONL or CSV file, one row per file.
+    Paths are stored relative to the library root. In CSV cells, tags with several values are stored as a JSON list.
+    Files that cannot be read are logged and left out.
+    :param path: The library root.
+    :param output:
+    :param fmt: "jsonl" or "csv". Taken from the output extension if not given.
+    :param tags: Tags to include as CSV columns. Defaults to CSV_TAGS.
+    :param jobs: Number of files read at once.
+    :param verbose:
+    :param logger:
+    :return: The number of files exported.
+    """
+    if not logger:
+        logger = get_logger(usefile=False)
+    path = abspath(path)
+    fmt = detect_format(output, fmt)
+    if tags is None:
+        tags = CSV_TAGS
+    count = 0
+    files = list(find_audio_files(path))
+
+    def read(file):
+        try:
+            return read_tags(file)
+        except Exception as e:
+            logger.warning(f'Exception {e.__class__}: {e}.\nSkipping "{relpath(file, path)}".')
+            return None
+
+    # Write to a temporary file, so a failed export does not leave a partial file behind
+    tmp = f'{output}.tmp'
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor, open(tmp, 'w', newline='') as f:
+            if fmt == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(['path'] + tags)
+            for file, file_tags in zip(files, executor.map(read, files)):
+                if file_tags is None:
+                    continue
+                rel = relpath(file, path)
+                if verbose:
+                    logger.info(f'Exporting "{rel}"...')
+                if fmt == 'csv':
+                    writer.writerow([rel] + [encode_cell(file_tags.get(x, [])) for x in tags])
+                else:
+                    f.write(json.dumps({'path': rel, 'tags': file_tags}, ensure_ascii=False) + '\n')
+                count += 1
+    except BaseException:
+        if exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, output)
+    logger.info(f'Exported tags for {count} files to "{abspath(output)}".')
+    return count
+
+
+def read_rows(path: PathLike | str, fmt: str | None = None):
+    """
+    Reads an export file, yielding (relative path, tags) pairs.
+    :param path:
+    :param fmt:
+    :return:
+    """
+    fmt = detect_format(path, fmt)
+    with open(path, 'r', newline='') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                rel = row.pop('path')
+                yield rel, {k: decode_cell(v) for k, v in row.items() if k}
+        else:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield row['path'], {k: [str(x) for x in v] for k, v in row['tags'].items()}
+
+
+def import_tags(path: PathLike | str,
+                source: PathLike | str,
+                original: PathLike | str = None,
+                fmt: str | None = None,
+                jobs: int = 4,
+                verbose: bool = False,
+                logger: logging.Logger = None):
+    """
+    Applies an edited export file back to a library.
+    Each file is loaded and saved at most once, and only files whose tags differ are saved.
+    If the original export is given, rows identical to it are skipped without opening the file.
+    :param path: The library root.
+    :param source: The edited export file.
+    :param original: The unedited export file.
+    :param fmt: "jsonl" or "csv". Taken from the file extension if not given.
+    :param jobs: Number of files written at once.
+    :param verbose:
+    :param logger:
+    :return: The number of files saved.
+    """
+    if not logger:
+        logger = get_logger(usefile=False)
+    path = abspath(path)
+    unchanged = {}
+    if original:
+        unchanged = dict(read_rows(original, fmt))
+
+    # Check every row before writing anything: two rows for one file would be written by two threads at once
+    rows = {}
+    duplicates = set()
+    for rel, tags in read_rows(source, fmt):
+        target = abspath(join(path, rel))
+        if not target.startswith(path + os.sep):
+            logger.warning(f'"{rel}" is outside "{path}". Skipping.')
+        elif target in rows:
+            duplicates.add(target)
+        else:
+            rows[target] = (rel, tags)
+    for target in duplicates:
+        logger.warning(f'"{rows.pop(target)[0]}" appears more than once. Skipping.')
+    rows = [(rel, tags) for rel, tags in rows.values() if unchanged.get(rel) != tags]
+    if verbose:
+        logger.info(f'{len(rows)} rows to check.')
+
+    def apply(row):
+        rel, tags = row
+        try:
+            saved = write_tags(join(path, rel), tags)
+        except Exception as e:
+            logger.warning(f'Exception {e.__class__}: {e}.\nSkipping "{rel}".')
+            return False
+        if saved and verbose:
+            logger.info(f'Saved "{rel}".')
+        return saved
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        count = sum(executor.map(apply, rows))
+    logger.info(f'Finished! Saved {count} files.')
+    return count
+
+
+@click.command()
+@click.option('-f', '--fmt', type=click.Choice(['jsonl', 'csv']), help='Output format. Taken from extension if unset.')
+@click.option('-t', '--tag', 'tags', multiple=True, help='Tag to include as a CSV column. May be given more than once.')
+@click.option('-j', '--jobs', default=4, show_default=True, help='Number of files read at once.')
+@click.option('-v', '--verbose', is_flag=True, help='Verbose mode.')
+@click.argument('path', type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+def export_tags_cli(path: PathLike | str,
+                    output: PathLike | str,
+                    fmt: str = None,
+                    tags: tuple[str] = (),
+                    jobs: int = 4,
+                    verbose: bool = False):
+    """
+    Command line tool for exporting the tags of a library.
+    Writes the tags of every MP3 and FLAC file in a directory and its subdirectories to a JSONL or CSV file.
+    MP3 files only export the common tags mutagen's EasyID3 maps (title, artist, genre...).
+    """
+    logger = get_logger(usefile=False)
+    if exists(output):
+        logger.warning(f'"{output}" already exists.')
+    else:
+        export_tags(path, output, fmt, list(tags) or None, jobs, verbose, logger)
+
+
+@click.command()
+@click.option('-r', '--original', type=click.Path(exists=True, dir_okay=False),
+              help='Unedited export file. Unchanged rows are skipped without opening the audio file.')
+@click.option('-f', '--fmt', type=click.Choice(['jsonl', 'csv']), help='Input format. Taken from extension if unset.')
+@click.option('-j', '--jobs', default=4, show_default=True, help='Number of files written at once.')
+@click.option('-v', '--verbose', is_flag=True, help='Verbose mode.')
+@click.argument('path', type=click.Path(exists=True, file_okay=False, dir_okay=True, writable=True))
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+def import_tags_cli(path: PathLike | str,
+                    source: PathLike | str,
+                    original: PathLike | str = None,
+                    fmt: str = None,
+                    jobs: int = 4,
+                    verbose: bool = False):
+    """
+    Command line tool for applying an edited tag export to a library.
+    Only files whose tags changed are saved. An empty value deletes the tag.
+    Multiple values in a CSV cell are written as a JSON list, e.g. ["Rock", "Pop"].
+    """
+    logger = get_logger(usefile=False)
+    if isdir(path):
+        import_tags(path, source, original, fmt, jobs, verbose, logger)
+
+
+if __name__ == '__main__':
+    pass
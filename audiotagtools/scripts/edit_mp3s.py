@@ -1,16 +1,49 @@
 import argparse
+import logging
 from os.path import abspath, exists, isdir
 
-from audiotagtools.scripts import find_music_dirs, get_logger, format_multipart_tags
+from audiotagtools.scripts import find_music_dirs, get_logger, format_multipart_tags, get_backend, BACKENDS
 
 
-def format_all_multipart_tags(path: str, old: str = '/', new: str = '|', verbose: bool = False):
+def format_dir_multipart_tags(path: str,
+                              old: str = '/',
+                              new: str = '|',
+                              verbose: bool = False,
+                              logger: logging.Logger = None,
+                              backend: str = 'mutagen'):
     """
-    Edits the tags of MP3 files in a directory and its subdirectories.
+    Edits the "artist", "composer" and "genre" tags of audio files in a single directory.
+    :param path:
+    :param old:
+    :param new:
+    :param verbose:
+    :param logger:
+    :param backend:
+    :return:
+    """
+    if not logger:
+        logger = get_logger(usefile=False)
+    logger.info(f'Formatting tags in "{path}"...')
+    for tag, case in ('artist', None), ('composer', None), ('genre', 'title'):
+        logger.info(f'Formatting "{tag}" tag...')
+        try:
+            format_multipart_tags(path, tag, old, new, case, verbose, logger, backend=backend)
+        except Exception as e:
+            logger.info(f'Exception {e.__class__}: {e}.\nSkipping this directory.')
+
+
+def format_all_multipart_tags(path: str,
+                              old: str = '/',
+                              new: str = '|',
+                              verbose: bool = False,
+                              backend: str = 'mutagen'):
+    """
+    Edits the tags of audio files in a directory and its subdirectories.
     :param verbose:
     :param path:
     :param old:
     :param new:
+    :param backend:
     :return:
     """
     # Create logger
@@ -21,16 +54,11 @@ def format_all_multipart_tags(path: str, old: str = '/', new: str = '|', verbose
         path = input('Please provide a directory: ')
     path = abspath(path)
     if exists(path) and isdir(path):
-        logger.info(f'Searching for MP3 files in "{path}"...')
-        mp3_dirs = find_music_dirs(path, filetype='mp3')
-        for d in mp3_dirs:
-            logger.info(f'Formatting tags in "{d}"...')
-            for tag, case in ('artist', None), ('composer', None), ('genre', 'title'):
-                logger.info(f'Formatting "{tag}" tag...')
-                try:
-                    format_multipart_tags(d, tag, old, new, case, verbose, logger)
-                except Exception as e:
-                    logger.info(f'Exception {e.__class__}: {e}.\nSkipping this directory.')
+        filetypes = [x.lstrip('.') for x in get_backend(backend).extensions]
+        logger.info(f'Searching for {" and ".join(x.upper() for x in filetypes)} files in "{path}"...')
+        music_dirs = sorted(set(d for x in filetypes for d in find_music_dirs(path, filetype=x)))
+        for d in music_dirs:
+            format_dir_multipart_tags(d, old, new, verbose, logger, backend)
         logger.info('Finished!')
     elif exists(path):
         logger.warning(f'"{path}" is not a directory.')
@@ -40,7 +68,7 @@ def format_all_multipart_tags(path: str, old: str = '/', new: str = '|', verbose
 
 def run():
     parser = argparse.ArgumentParser(
-        description='Edits the tags of MP3 files in a directory and its subdirectories.'
+        description='Edits the tags of MP3 and FLAC files in a directory and its subdirectories.'
     )
 
     # Commands
@@ -48,10 +76,15 @@ def run():
     parser.add_argument('-o', '--old', default='/', help='The original delimiter for the tags.')
     parser.add_argument('-n', '--new', default='|', help='The new delimiter for the tags.')
     parser.add_argument('-v', '--verbose', action='store_true', help='Verbose mode.')
+    parser.add_argument('-b',
+                        '--backend',
+                        choices=list(BACKENDS),
+                        default='mutagen',
+                        help='The tag backend. "eyed3" only handles MP3 files.')
 
     args = parser.parse_args()
     if args:
-        format_all_multipart_tags(args.path, args.old, args.new, args.verbose)
+        format_all_multipart_tags(args.path, args.old, args.new, args.verbose, args.backend)
 
 
 if __name__ == '__main__':
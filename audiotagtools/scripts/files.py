@@ -1,5 +1,6 @@
 import logging
 import re
+from collections.abc import Callable
 from os import PathLike, walk, scandir, mkdir, remove
 from os.path import split, join, exists, abspath, isfile, isdir, basename
 from shutil import copytree, rmtree, move
@@ -12,6 +13,8 @@ from pydub import AudioSegment
 from pydub.utils import mediainfo
 from pyperclip import copy
 
+from audiotagtools.scripts.silence import trim_silence
+
 
 def find_music_dirs(path: PathLike | str, filetype: str = 'flac'):
     """
@@ -169,9 +172,17 @@ def flac_to_mp3(path: PathLike | str,
                 bitrate: int = 256,
                 verbose: bool = False,
                 inplace: bool = False,
-                delete: bool = False):
+                delete: bool = False,
+                trim: bool = False,
+                silence_thresh: float = -50.0,
+                min_silence_len: int = 1000,
+                proceed: Callable[[], bool] = None):
     """
-    For a given directory, creates a folder of MP3 copies of all FLAC files
+    For a given directory, creates a folder of MP3 copies of all FLAC files.
+    Optionally trims leading and trailing silence quieter than "silence_thresh" dBFS and longer than
+    "min_silence_len" milliseconds.
+    If given, "proceed" is called before the FLAC files are moved or deleted. If it returns False, the original
+    directory is left untouched and the MP3 copies stay in their own folder.
     """
     if delete:
         inplace = True
@@ -206,6 +217,11 @@ def flac_to_mp3(path: PathLike | str,
             export_path = join(output, mp3_name)  # Create export path for new MP3 file
             if verbose:
                 logging.info(f'Processing "{flac_name}"...')
+            if trim:
+                segment, report = trim_silence(segment, min_silence_len, silence_thresh)
+                if verbose and (report['leading'] or report['trailing']):
+                    logging.info(f'Trimmed {report["leading"]} ms of leading and {report["trailing"]} ms of '
+                                 f'trailing silence.')
             segment.export(export_path, format='mp3', bitrate=bitrate_str, tags=tags)
             mp3 = MP3(export_path)  # Create MP3 object to add picture metadata (album art)
             flac = FLAC(entry.path)  # Create FLAC object to extract picture data
@@ -221,6 +237,10 @@ def flac_to_mp3(path: PathLike | str,
                 )
                 mp3.save(v2_version=3)  # Save as ID3v2.3
 
+        if inplace and proceed and not proceed():
+            logging.warning(f'Not replacing the FLAC files in "{path}". New files can be found in "{output}".')
+            return
+
         # Replace the original folder with the new
         if inplace:
             if delete:
@@ -267,17 +287,23 @@ def flac_to_mp3(path: PathLike | str,
                    'the same name preceeded by a ".". Automatically set by --delete.'
               )
 @click.option('-d', '--delete', is_flag=True, help='Delete old FLAC files. Automatically sets --inplace.')
+@click.option('-t', '--trim', is_flag=True, help='Trim leading and trailing silence.')
+@click.option('-s', '--silence-thresh', default=-50.0, help='Silence threshold in dBFS, used by --trim. default: -50')
+@click.option('-m', '--min-silence', default=1000, help='Minimum silence length in ms, used by --trim. default: 1000')
 @click.argument('path', type=click.Path(exists=True, file_okay=False, dir_okay=True, writable=True))
 def flac_to_mp3_cli(path: PathLike | str,
                     bitrate: int = 256,
                     verbose: bool = False,
                     inplace: bool = False,
-                    delete: bool = False):
+                    delete: bool = False,
+                    trim: bool = False,
+                    silence_thresh: float = -50.0,
+                    min_silence: int = 1000):
     """
     A command line tool for converting FLAC files to MP3.
     For a given directory, creates a folder of MP3 copies of all FLAC files
     """
-    flac_to_mp3(path, bitrate, verbose, inplace, delete)
+    flac_to_mp3(path, bitrate, verbose, inplace, delete, trim, silence_thresh, min_silence)
 
 
 if __name__ == '__main__':
@@ -1,3 +1,4 @@
+from os import PathLike
 from os.path import splitext
 
 import click
@@ -14,6 +15,17 @@ def resize_image(image, width, name):
     Converts the image to JPEG format, if necessary.\n
     Renames the output to "folder.jpg" This WILL overwrite any file named "folder.jpg".
     """
+    resize(image, width, name)
+
+
+def resize(image: PathLike | str, width: int = 1000, name: PathLike | str = 'folder'):
+    """
+    Formats an image to a specific pixel-width and saves it as a JPEG named "<name>.jpg".
+    :param image:
+    :param width:
+    :param name: Filename of the output image, without extension. May include a directory.
+    :return:
+    """
     with Image(filename=image) as img:
         fname, ext = splitext(image)
         if ext not in ['jpg', 'jpeg']:
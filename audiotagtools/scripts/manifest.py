@@ -0,0 +1,393 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from os import PathLike
+from os.path import abspath, exists, join, relpath
+from uuid import uuid4
+
+import click
+
+from audiotagtools.scripts import find_music_dirs, flac_to_mp3, get_logger
+from audiotagtools.scripts.edit_mp3s import format_dir_multipart_tags
+
+OPERATIONS = ['flac-to-mp3', 'format-multipart-tags']
+"""
+The operations a manifest can be drained with
+"""
+
+
+def create_manifest(path: PathLike | str, manifest: PathLike | str, filetype: str = 'flac'):
+    """
+    Splits the music directories of a library into units of work and writes them to a manifest directory.
+    Each unit is one directory from find_music_dirs, stored relative to the library root so nodes that mount
+    the library elsewhere can resolve it. Completion is recorded per unit in "<manifest>/done".
+    :param path: The library root.
+    :param manifest: The manifest directory. Must be on storage shared by all workers.
+    :param filetype:
+    :return: The number of units.
+    """
+    path = abspath(path)
+    manifest = abspath(manifest)
+    manifest_file = join(manifest, 'manifest.json')
+    if exists(manifest_file):
+        raise FileExistsError(f'"{manifest_file}" already exists.')
+    for d in [manifest, join(manifest, 'locks'), join(manifest, 'done')]:
+        os.makedirs(d, exist_ok=True)
+    dirs = find_music_dirs(path, filetype=filetype)
+    units = [{'id': f'{i:06d}', 'path': relpath(d, path)} for i, d in enumerate(dirs)]
+    tmp = f'{manifest_file}.{uuid4().hex}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'root': path, 'filetype': filetype, 'created': time.time(), 'units': units}, f, indent=2)
+    os.replace(tmp, manifest_file)  # Workers never see a partly written manifest
+    return len(units)
+
+
+def read_manifest(manifest: PathLike | str):
+    """
+    Reads a manifest directory's unit list
+    :param manifest:
+    :return:
+    """
+    with open(join(manifest, 'manifest.json'), 'r') as f:
+        return json.load(f)
+
+
+def manifest_status(manifest: PathLike | str):
+    """
+    Returns the ids of the finished, failed, claimed and remaining units of a manifest.
+    :param manifest:
+    :return:
+    """
+    units = [x['id'] for x in read_manifest(manifest)['units']]
+    done = {}
+    for name in os.listdir(join(manifest, 'done')):
+        if name.endswith('.json'):
+            with open(join(manifest, 'done', name), 'r') as f:
+                done[name[:-5]] = json.load(f)
+    locks = {x[:-5] for x in os.listdir(join(manifest, 'locks')) if x.endswith('.lock')}
+    return {
+        'finished': [x for x in units if x in done and not done[x].get('error')],
+        'failed': [x for x in units if x in done and done[x].get('error')],
+        'claimed': [x for x in units if x not in done and x in locks],
+        'remaining': [x for x in units if x not in done and x not in locks]
+    }
+
+
+class Lease:
+    """
+    An exclusive claim on a unit of work, held by a lock file on shared storage.
+    The lock is created atomically and kept alive by touching it. A lock that has not been
+    touched for "lease" seconds belongs to a crashed worker and may be taken over.
+    Ages are measured against a file touched on the same filesystem, so clock differences
+    between nodes do not matter.
+    """
+
+    def __init__(self, lock: str, worker: str, lease: float = 60.0):
+        self.lock = lock
+        self.worker = worker
+        self.lease = lease
+        self.token = uuid4().hex
+        self._stop = threading.Event()
+        self._lost = threading.Event()
+        self._thread = None
+
+    @property
+    def lost(self):
+        """
+        True if the lease could not be renewed in time, or was taken over. The unit may then be
+        processed by another worker, so its result should not be recorded.
+        """
+        return self._lost.is_set()
+
+    def held(self):
+        """
+        Checks now, rather than at the next renewal, that the lock still holds this lease's token.
+        Marks the lease lost if it does not, or if the lock cannot be read.
+        """
+        if not self.lost:
+            try:
+                with open(self.lock, 'r') as f:
+                    if json.load(f).get('token') != self.token:
+                        self._lost.set()
+            except (OSError, ValueError):
+                self._lost.set()
+        return not self.lost
+
+    def _create(self):
+        try:
+            fd = os.open(self.lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'worker': self.worker, 'token': self.token, 'claimed': time.time()}, f)
+        return True
+
+    def _now(self):
+        """
+        Returns the current time according to the filesystem holding the lock
+        """
+        probe = join(os.path.dirname(self.lock), f'.clock.{self.token}')
+        with open(probe, 'w'):
+            pass
+        try:
+            return os.stat(probe).st_mtime
+        finally:
+            os.remove(probe)
+
+    def _expired(self, path: str):
+        return self._now() - os.stat(path).st_mtime >= self.lease
+
+    def _break_stale(self):
+        """
+        Removes the lock if its lease has expired. Returns True if a stale lock was removed.
+        """
+        try:
+            with open(self.lock, 'r') as f:
+                stale = f.read()
+            if not self._expired(self.lock):
+                return False
+        except FileNotFoundError:
+            return True
+        # Rename is atomic, so only one worker can take the lock out of place
+        taken = f'{self.lock}.{self.token}.stale'
+        try:
+            os.rename(self.lock, taken)
+        except FileNotFoundError:
+            return False
+        with open(taken, 'r') as f:
+            current = f.read()
+        if current != stale or not self._expired(taken):
+            # The lock was replaced or renewed in the meantime; put it back
+            try:
+                os.link(taken, self.lock)
+            except FileExistsError:
+                # Someone claimed the unit while the lock was out of place. Never delete a lock that may
+                # be live: leave it aside, so its owner sees the change and stops before making changes
+                return False
+            os.remove(taken)
+            return False
+        os.remove(taken)
+        return True
+
+    def acquire(self):
+        """
+        Tries to claim the lock without waiting. Starts renewing the lease on success.
+        :return:
+        """
+        if not self._create():
+            if not self._break_stale() or not self._create():
+                return False
+        self._thread = threading.Thread(target=self._renew, daemon=True)
+        self._thread.start()
+        return True
+
+    def _renew(self):
+        """
+        Touches the lock every third of the lease. Failed renewals (e.g. a transient NFS error, or the lock
+        briefly moved aside by another worker's _break_stale) are retried. The lease is marked lost if the
+        lock now belongs to another worker, or if it has gone unrenewed for two thirds of the lease.
+        """
+        renewed = time.monotonic()
+        while not self._stop.wait(self.lease / 3):
+            try:
+                with open(self.lock, 'r') as f:
+                    if json.load(f).get('token') != self.token:
+                        self._lost.set()
+                        return
+                os.utime(self.lock)
+                renewed = time.monotonic()
+            except (OSError, ValueError):
+                if time.monotonic() - renewed >= self.lease * 2 / 3:
+                    self._lost.set()
+                    return
+
+    def release(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        try:
+            with open(self.lock, 'r') as f:
+                owned = json.load(f).get('token') == self.token
+            if owned:
+                os.remove(self.lock)
+        except (OSError, ValueError):
+            pass
+
+
+def run_operation(path: str,
+                  operation: str,
+                  bitrate: int = 256,
+                  inplace: bool = False,
+                  delete: bool = False,
+                  old: str = '/',
+                  new: str = '|',
+                  verbose: bool = False,
+                  logger: logging.Logger = None,
+                  lease: Lease = None):
+    """
+    Runs one of OPERATIONS on a single directory.
+    If a lease is given, nothing is changed once it is lost: the operation is not started, and FLAC files
+    are not replaced.
+    :param path:
+    :param operation:
+    :param bitrate:
+    :param inplace:
+    :param delete:
+    :param old:
+    :param new:
+    :param verbose:
+    :param logger:
+    :param lease: The claim on the unit.
+    :return:
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f'Unknown operation "{operation}". Options are {", ".join(OPERATIONS)}.')
+    if lease and not lease.held():
+        return
+    if operation == 'flac-to-mp3':
+        flac_to_mp3(path, bitrate, verbose, inplace, delete, proceed=lease.held if lease else None)
+    else:
+        format_dir_multipart_tags(path, old, new, verbose, logger)
+
+
+def drain_manifest(manifest: PathLike | str,
+                   operation: str = 'flac-to-mp3',
+                   lease: float = 60.0,
+                   wait: float = 5.0,
+                   worker: str = None,
+                   root: PathLike | str = None,
+                   verbose: bool = False,
+                   logger: logging.Logger = None,
+                   **options):
+    """
+    Claims and processes units of a manifest until every unit is finished.
+    Any number of workers, on any node sharing the manifest directory, may drain the same manifest.
+    Units claimed by a worker that stopped renewing its lease are taken over once the lease expires.
+    :param manifest:
+    :param operation: One of OPERATIONS.
+    :param lease: Seconds a claim stays valid without being renewed.
+    :param wait: Seconds to wait before checking units claimed by other workers again.
+    :param worker: Name recorded for this worker. Defaults to "<host>:<pid>".
+    :param root: Where the library is mounted on this node. Defaults to the root recorded in the manifest.
+    :param verbose:
+    :param logger:
+    :param options: Passed to run_operation.
+    :return: The number of units this worker processed.
+    """
+    if not logger:
+        logger = get_logger(usefile=False)
+    if operation not in OPERATIONS:
+        raise ValueError(f'Unknown operation "{operation}". Options are {", ".join(OPERATIONS)}.')
+    if not worker:
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+    manifest = abspath(manifest)
+    data = read_manifest(manifest)
+    units = data['units']
+    root = abspath(root) if root else data['root']
+    count = 0
+    while True:
+        pending = [x for x in units if not exists(join(manifest, 'done', f'{x["id"]}.json'))]
+        if not pending:
+            break
+        claimed = False
+        for unit in pending:
+            claim = Lease(join(manifest, 'locks', f'{unit["id"]}.lock'), worker, lease)
+            if not claim.acquire():
+                continue
+            claimed = True
+            try:
+                done_file = join(manifest, 'done', f'{unit["id"]}.json')
+                if exists(done_file):  # Finished by another worker after we listed it
+                    continue
+                logger.info(f'{worker}: processing "{unit["path"]}"...')
+                error = None
+                try:
+                    run_operation(join(root, unit['path']), operation, verbose=verbose, logger=logger, lease=claim,
+                                  **options)
+                except Exception as e:
+                    error = f'{e.__class__.__name__}: {e}'
+                    logger.warning(f'Exception {e.__class__}: {e}.\nSkipping "{unit["path"]}".')
+                if not claim.held():
+                    logger.warning(f'{worker}: lost the lease on "{unit["path"]}" while processing it. '
+                                   f'Not recording it as finished.')
+                    continue
+                tmp = f'{done_file}.{claim.token}.tmp'
+                with open(tmp, 'w') as f:
+                    json.dump({'worker': worker, 'operation': operation, 'finished': time.time(), 'error': error}, f)
+                os.replace(tmp, done_file)
+                count += 1
+            finally:
+                claim.release()
+        if not claimed:
+            # Everything left is claimed by other workers; wait for them to finish or for their leases to expire
+            time.sleep(wait)
+    logger.info(f'{worker}: finished! Processed {count} units.')
+    return count
+
+
+@click.command()
+@click.option('-t', '--filetype', default='flac', show_default=True, help='File type that marks a music directory.')
+@click.argument('path', type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.argument('manifest', type=click.Path(file_okay=False, writable=True))
+def create_manifest_cli(path: PathLike | str, manifest: PathLike | str, filetype: str = 'flac'):
+    """
+    Command line tool for splitting a library job into units that several workers can process.
+    Writes one unit per music directory into the manifest directory.
+    """
+    logger = get_logger(usefile=False)
+    try:
+        count = create_manifest(path, manifest, filetype)
+        logger.info(f'Created manifest with {count} units in "{abspath(manifest)}".')
+    except FileExistsError as e:
+        logger.warning(str(e))
+
+
+@click.command()
+@click.option('-p', '--operation', type=click.Choice(OPERATIONS), default='flac-to-mp3', show_default=True,
+              help='Operation to run on each unit.')
+@click.option('-l', '--lease', default=60.0, show_default=True,
+              help='Seconds before a claim by an unresponsive worker can be taken over.')
+@click.option('-b', '--bitrate', default=256, help='Bitrate of converted MP3 files. default: 256')
+@click.option('-i', '--inplace', is_flag=True, help='Replace FLAC files with converted MP3 files.')
+@click.option('-d', '--delete', is_flag=True, help='Delete FLAC files after conversion. Automatically sets --inplace.')
+@click.option('-o', '--old', type=click.STRING, default='/', help='Old tag delimiter.')
+@click.option('-n', '--new', type=click.STRING, default='|', help='New tag delimiter.')
+@click.option('-r', '--root', type=click.Path(exists=True, file_okay=False),
+              help='Library root on this node. Defaults to the root recorded in the manifest.')
+@click.option('-v', '--verbose', is_flag=True, help='Verbose mode.')
+@click.argument('manifest', type=click.Path(exists=True, file_okay=False, writable=True))
+def drain_manifest_cli(manifest: PathLike | str,
+                       operation: str,
+                       lease: float,
+                       root: PathLike | str,
+                       bitrate: int,
+                       inplace: bool,
+                       delete: bool,
+                       old: str,
+                       new: str,
+                       verbose: bool):
+    """
+    Command line tool for processing the units of a manifest.
+    Run it on as many nodes or processes as needed; each unit is processed once.
+    """
+    logger = get_logger(usefile=False)
+    drain_manifest(manifest, operation, lease, root=root, verbose=verbose, logger=logger,
+                   bitrate=bitrate, inplace=inplace, delete=delete, old=old, new=new)
+
+
+@click.command()
+@click.option('-v', '--verbose', is_flag=True, help='List unit ids in each state.')
+@click.argument('manifest', type=click.Path(exists=True, file_okay=False))
+def manifest_status_cli(manifest: PathLike | str, verbose: bool = False):
+    """
+    Command line tool for showing the progress of a manifest.
+    """
+    for state, ids in manifest_status(manifest).items():
+        click.echo(f'{state}: {len(ids)}' + (f' ({", ".join(ids)})' if verbose and ids else ''))
+
+
+if __name__ == '__main__':
+    pass
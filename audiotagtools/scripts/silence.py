@@ -0,0 +1,159 @@
+import logging
+from os import PathLike, scandir
+from os.path import abspath, isdir
+
+import click
+import numpy as np
+from pydub import AudioSegment
+
+BLOCK_WINDOWS = 1 << 16
+"""
+Number of windows squared and summed at once, to bound memory use on long tracks
+"""
+
+
+def window_energy(segment: AudioSegment, window: int = 10):
+    """
+    Returns the sum of squared samples and the number of samples in each "window" millisecond window of a segment,
+    over all channels. Computed in bulk with NumPy over the raw PCM buffer.
+    Windows follow pydub's millisecond slicing, so the last one may be partial.
+    :param segment:
+    :param window: Window length in milliseconds.
+    :return:
+    """
+    samples = np.frombuffer(segment.get_array_of_samples(), dtype=np.dtype(segment.array_type))
+    samples = samples.reshape(-1, segment.channels)
+    frames = len(samples)
+    count = -(-len(segment) // window)
+    sums = np.empty(count, dtype=np.float64)
+    sizes = np.empty(count, dtype=np.float64)
+    for start in range(0, count, BLOCK_WINDOWS):
+        stop = min(count, start + BLOCK_WINDOWS)
+        # Frame boundaries of each window, so windows stay aligned to milliseconds at any frame rate
+        bounds = np.minimum(np.arange(start, stop + 1) * segment.frame_rate * window // 1000, frames)
+        block = samples[bounds[0]:bounds[-1]].astype(np.float64)
+        squares = np.einsum('ij,ij->i', block, block)
+        sums[start:stop] = np.add.reduceat(squares, np.minimum(bounds[:-1] - bounds[0], max(0, len(squares) - 1)))
+        sizes[start:stop] = np.diff(bounds) * segment.channels
+    sums[sizes == 0] = 0.0  # reduceat repeats a value for empty windows
+    return sums, sizes
+
+
+def detect_silence(segment: AudioSegment,
+                   min_silence_len: int = 1000,
+                   silence_thresh: float = -50.0,
+                   window: int = 10):
+    """
+    Returns a list of all silent sections [start, end] in milliseconds of a segment.
+    A drop-in replacement for pydub.silence.detect_silence, with "window" in place of "seek_step":
+    the RMS of every stretch of whole windows covering "min_silence_len", starting on a window boundary,
+    is compared to the threshold.
+    :param segment:
+    :param min_silence_len: Minimum length of a silent section in milliseconds.
+    :param silence_thresh: Upper bound for how quiet is silent, in dBFS.
+    :param window: Step between checked stretches, in milliseconds. With 1, results match pydub's seek_step=1.
+    :return:
+    """
+    seg_len = len(segment)
+    if seg_len < min_silence_len:
+        return []
+    span = max(1, -(-min_silence_len // window))  # Windows per checked stretch, covering at least min_silence_len
+    sums, sizes = window_energy(segment, window)
+    if len(sums) < span:
+        return []
+
+    # RMS of every run of "span" consecutive windows, via cumulative sums. Like pydub (audioop.rms), truncated
+    cumulative = np.concatenate(([0.0], np.cumsum(sums)))
+    samples = np.concatenate(([0.0], np.cumsum(sizes)))
+    counts = np.maximum(samples[span:] - samples[:-span], 1)
+    rms = np.floor(np.sqrt((cumulative[span:] - cumulative[:-span]) / counts))
+    rms = rms[:(seg_len - min_silence_len) // window + 1]  # Stretches that fit in the segment
+    thresh = 10 ** (silence_thresh / 20) * segment.max_possible_amplitude
+    starts = np.flatnonzero(rms <= thresh)
+    if not len(starts):
+        return []
+
+    # Combine overlapping silent stretches into ranges
+    breaks = np.flatnonzero(np.diff(starts) > span)
+    firsts = np.concatenate(([starts[0]], starts[breaks + 1]))
+    lasts = np.concatenate((starts[breaks], [starts[-1]]))
+    return [[int(f * window), min(seg_len, int((l + span) * window))] for f, l in zip(firsts, lasts)]
+
+
+def measure_silence(segment: AudioSegment,
+                    min_silence_len: int = 1000,
+                    silence_thresh: float = -50.0,
+                    window: int = 10):
+    """
+    Reports the leading, trailing and internal silence of a segment.
+    :param segment:
+    :param min_silence_len:
+    :param silence_thresh:
+    :param window:
+    :return: A dict with "leading" and "trailing" lengths in milliseconds and "internal" [start, end] ranges.
+    """
+    ranges = detect_silence(segment, min_silence_len, silence_thresh, window)
+    seg_len = len(segment)
+    leading = trailing = 0
+    if ranges and ranges[0][0] == 0:
+        leading = ranges.pop(0)[1]
+    if ranges and ranges[-1][1] >= seg_len - window:
+        trailing = seg_len - ranges.pop()[0]
+    elif leading >= seg_len - window:
+        trailing = leading  # The whole segment is silent
+    return {'leading': leading, 'trailing': trailing, 'internal': ranges}
+
+
+def trim_silence(segment: AudioSegment,
+                 min_silence_len: int = 1000,
+                 silence_thresh: float = -50.0,
+                 padding: int = 200,
+                 window: int = 10):
+    """
+    Removes leading and trailing silence from a segment, keeping "padding" milliseconds at each end.
+    Silence inside the segment is left alone. A completely silent segment is returned unchanged.
+    :param segment:
+    :param min_silence_len:
+    :param silence_thresh:
+    :param padding:
+    :param window:
+    :return: The trimmed segment and the report from measure_silence.
+    """
+    report = measure_silence(segment, min_silence_len, silence_thresh, window)
+    seg_len = len(segment)
+    if report['leading'] >= seg_len - window:
+        return segment, report
+    start = max(0, report['leading'] - padding)
+    end = min(seg_len, seg_len - report['trailing'] + padding)
+    if start == 0 and end == seg_len:
+        return segment, report
+    return segment[start:end], report
+
+
+@click.command()
+@click.option('-m', '--min-silence', default=1000, show_default=True, help='Minimum silence length in ms.')
+@click.option('-s', '--silence-thresh', default=-50.0, show_default=True, help='Silence threshold in dBFS.')
+@click.option('-f', '--filetype', default='flac', show_default=True, help='File type.')
+@click.argument('path', type=click.Path(exists=True, file_okay=False, dir_okay=True))
+def report_silence_cli(path: PathLike | str, min_silence: int = 1000, silence_thresh: float = -50.0,
+                       filetype: str = 'flac'):
+    """
+    Command line tool for finding silence in audio files.
+    Prints the leading, trailing and internal silence of every file of the given type in a directory.
+    """
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    path = abspath(path)
+    if isdir(path):
+        entries = sorted([x for x in scandir(path) if x.is_file() and x.name.endswith('.' + filetype)],
+                         key=lambda e: e.name)
+        for entry in entries:
+            report = measure_silence(AudioSegment.from_file(entry.path), min_silence, silence_thresh)
+            internal = ', '.join(f'{s / 1000:.1f}-{e / 1000:.1f}s' for s, e in report['internal'])
+            click.echo(f'{entry.name}: leading {report["leading"] / 1000:.1f}s, '
+                       f'trailing {report["trailing"] / 1000:.1f}s' + (f', internal {internal}' if internal else ''))
+        if not entries:
+            logging.warning(f'No {filetype.upper()} files found in "{path}".')
+
+
+if __name__ == '__main__':
+    pass
@@ -7,6 +7,8 @@ import click
 from pydub import AudioSegment
 from pydub.utils import mediainfo
 
+from audiotagtools.scripts.silence import trim_silence
+
 SegmentDict = TypedDict('SegmentDict', {'direntry': DirEntry, 'segment': AudioSegment})
 """
 A TypedDict that keeps the original audio file information tethered to the AudioSegment it generates
@@ -38,7 +40,8 @@ def adjust_volume_level(segments: List[SegmentDict], adjustment: int = 10):
     return segments
 
 
-def adjust_volume(path, levelchange=10, inplace=False, verbose=False):
+def adjust_volume(path, levelchange=10, inplace=False, verbose=False, trim=False, silence_thresh=-50.0,
+                  min_silence_len=1000):
     logging.basicConfig(level=logging.INFO, format='%(message)s')
     msg = []
     if not verbose:
@@ -84,6 +87,11 @@ def adjust_volume(path, levelchange=10, inplace=False, verbose=False):
                 m = mediainfo(seg_dict['direntry'].path)['TAG']
                 if verbose:
                     logging.info(f'Processing "{t}" ...')
+                if trim:
+                    seg_dict['segment'], report = trim_silence(seg_dict['segment'], min_silence_len, silence_thresh)
+                    if verbose and (report['leading'] or report['trailing']):
+                        logging.info(f'Trimmed {report["leading"]} ms of leading and {report["trailing"]} ms of '
+                                     f'trailing silence.')
                 seg_dict['segment'] += levelchange
                 seg_dict['segment'].export(join(output, t), tags=m)
 
@@ -116,24 +124,30 @@ def adjust_volume(path, levelchange=10, inplace=False, verbose=False):
 @click.option('-i', '--inplace', default=False, is_flag=True, help='Directly edit files in directory.')
 @click.option('-l', '--levelchange', default=10, help='Number of dB to increase volume by.')
 @click.option('-v', '--verbose', default=False, is_flag=True, help='Verbose mode.')
+@click.option('-t', '--trim', default=False, is_flag=True, help='Trim leading and trailing silence.')
+@click.option('-s', '--silence-thresh', default=-50.0, help='Silence threshold in dBFS, used by --trim.')
+@click.option('-m', '--min-silence', default=1000, help='Minimum silence length in ms, used by --trim.')
 @click.argument('path')
-def increase_volume(path, levelchange, inplace, verbose):
+def increase_volume(path, levelchange, inplace, verbose, trim, silence_thresh, min_silence):
     """
     Increases the volume of all mp3 files in a directory.
     """
-    adjust_volume(path, levelchange, inplace, verbose)
+    adjust_volume(path, levelchange, inplace, verbose, trim, silence_thresh, min_silence)
 
 
 @click.command()
 @click.option('-i', '--inplace', default=False, is_flag=True, help='Directly edit files in directory.')
 @click.option('-l', '--levelchange', default=10, help='Number of dB to decrease volume by.')
 @click.option('-v', '--verbose', default=False, is_flag=True, help='Verbose mode.')
+@click.option('-t', '--trim', default=False, is_flag=True, help='Trim leading and trailing silence.')
+@click.option('-s', '--silence-thresh', default=-50.0, help='Silence threshold in dBFS, used by --trim.')
+@click.option('-m', '--min-silence', default=1000, help='Minimum silence length in ms, used by --trim.')
 @click.argument('path')
-def decrease_volume(path, levelchange, inplace, verbose):
+def decrease_volume(path, levelchange, inplace, verbose, trim, silence_thresh, min_silence):
     """
     Decreases the volume of all mp3 files in a directory.
     """
-    adjust_volume(path, -1 * levelchange, inplace, verbose)
+    adjust_volume(path, -1 * levelchange, inplace, verbose, trim, silence_thresh, min_silence)
 
 
 if __name__ == '__main__':
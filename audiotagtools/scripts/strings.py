@@ -7,6 +7,8 @@ import click
 import eyed3
 import pyperclip
 
+from audiotagtools.scripts.backends import TagBackend, BACKENDS, get_backend
+
 
 UPPER_CASE = [
     'aor',
@@ -106,11 +108,13 @@ def format_multipart_tags(path: PathLike | str,
                           case: str = 'title',
                           verbose: bool = False,
                           logger: logging.Logger = None,
-                          eyed3_warn: bool = False):
+                          eyed3_warn: bool = False,
+                          backend: str | TagBackend = 'mutagen'):
     """
-    Searches a directory for MP3 files and formats them.
+    Searches a directory for audio files and formats them.
     Replaces the delimiters between values in the specfied tag.
     Sets case for the "genre" tag.
+    The "mutagen" backend handles MP3 and FLAC files; the "eyed3" backend only handles MP3 files.
     :param path:
     :param tag:
     :param old:
@@ -119,6 +123,7 @@ def format_multipart_tags(path: PathLike | str,
     :param verbose:
     :param logger:
     :param eyed3_warn:
+    :param backend:
     :return:
     """
     # Create logger, if necessary
@@ -137,29 +142,35 @@ def format_multipart_tags(path: PathLike | str,
         logger.warning(message)
         sys.exit()
 
+    backend = get_backend(backend)
+    filetypes = ' or '.join(x.lstrip('.').upper() for x in backend.extensions)
+
     # Get files as directory entries
-    entries = [x for x in scandir(path) if isfile(x) and x.name.endswith('.mp3')]
+    entries = [x for x in scandir(path) if isfile(x) and backend.supports(x.name)]
     entries = sorted(entries, key=lambda e: e.name)
 
-    # Process all MP3 files at once, if found
+    # Process all audio files at once, if found
     if entries:
-        path_tags = [{'path': x.path, 'tag_obj': eyed3.load(x.path).tag} for x in entries]
+        path_tags = [{'path': x.path, 'tag_obj': backend.load(x.path)} for x in entries]
         for d in path_tags:
             if verbose:
                 logger.info(f'Processing "{d["path"]}"...')
             tag_obj = d['tag_obj']
             if tag_obj:
-                tagvalue = getattr(tag_obj, tag)
+                tagvalue = backend.get(tag_obj, tag, old)
                 if tagvalue:
-                    newvalue = format_string(str(tagvalue), old, new, case=case)
-                    setattr(tag_obj, tag, newvalue)
+                    newvalue = format_string(tagvalue, old, new, case=case)
+                    if newvalue != tagvalue:
+                        backend.set(tag_obj, tag, newvalue)
+                        d['changed'] = True
         if verbose:
             logger.info('Saving changes...')
         # Save all changes at once
         for d in path_tags:
-            d['tag_obj'].save()
+            if d.get('changed'):
+                backend.save(d['tag_obj'])
     else:
-        logger.info(f'No MP3 files found in "{path}".')
+        logger.info(f'No {filetypes} files found in "{path}".')
 
 
 @click.command()
@@ -171,16 +182,22 @@ def format_multipart_tags(path: PathLike | str,
               help='Character case to use. Options are "title", "capitalize", "upper", and "lower".')
 @click.option('-v', '--verbose', is_flag=True, help='Verbose mode.')
 @click.option('-w', '--eyed3_warn', is_flag=True, help='Unsuppress warnings from eyed3 module.')
+@click.option('-b',
+              '--backend',
+              type=click.Choice(list(BACKENDS)),
+              default='mutagen',
+              help='Tag backend. "eyed3" only handles MP3 files.')
 @click.argument('path', type=click.Path(writable=True, file_okay=False, exists=True))
 def format_artist_tag_cli(path: PathLike | str,
                           old: str = '/',
                           new: str = '|',
                           case: str = None,
                           verbose: bool = False,
-                          eyed3_warn: bool = False):
+                          eyed3_warn: bool = False,
+                          backend: str = 'mutagen'):
     """
-    Command line tool for editing the artists tag for MP3 files.
-    Searches a directory for MP3 files and formats their artist tags.
+    Command line tool for editing the artists tag for MP3 and FLAC files.
+    Searches a directory for MP3 and FLAC files and formats their artist tags.
     Replaces delimiters and converts case.
     """
     logger = get_logger(usefile=False)
@@ -191,7 +208,8 @@ def format_artist_tag_cli(path: PathLike | str,
                           case,
                           verbose,
                           logger,
-                          eyed3_warn)
+                          eyed3_warn,
+                          backend)
 
 
 @click.command()
@@ -203,21 +221,27 @@ def format_artist_tag_cli(path: PathLike | str,
               help='Character case to use. Options are "title", "capitalize", "upper", and "lower".')
 @click.option('-v', '--verbose', is_flag=True, help='Verbose mode.')
 @click.option('-w', '--eyed3_warn', is_flag=True, help='Unsuppress warnings from eyed3 module.')
+@click.option('-b',
+              '--backend',
+              type=click.Choice(list(BACKENDS)),
+              default='mutagen',
+              help='Tag backend. "eyed3" only handles MP3 files.')
 @click.argument('path', type=click.Path(writable=True, file_okay=False, exists=True))
 def format_composer_tag_cli(path: PathLike | str,
                             old: str = '/',
                             new: str = '|',
                             case: str = None,
                             verbose: bool = False,
-                            eyed3_warn: bool = False):
+                            eyed3_warn: bool = False,
+                            backend: str = 'mutagen'):
     """
-    Command line tool for editing the composer tag for MP3 files.
-    Searches a directory for MP3 files and formats their composer tags.
+    Command line tool for editing the composer tag for MP3 and FLAC files.
+    Searches a directory for MP3 and FLAC files and formats their composer tags.
     Replaces delimiters and converts case.
     """
     logger = get_logger(usefile=False)
     format_multipart_tags(path, 'composer', old, new, case, verbose, logger,
-                          eyed3_warn)
+                          eyed3_warn, backend)
 
 
 @click.command()
@@ -229,21 +253,27 @@ def format_composer_tag_cli(path: PathLike | str,
               help='Character case to use. Options are "title", "capitalize", "upper", and "lower".')
 @click.option('-v', '--verbose', is_flag=True, help='Verbose mode.')
 @click.option('-w', '--eyed3_warn', is_flag=True, help='Unsuppress warnings from eyed3 module.')
+@click.option('-b',
+              '--backend',
+              type=click.Choice(list(BACKENDS)),
+              default='mutagen',
+              help='Tag backend. "eyed3" only handles MP3 files.')
 @click.argument('path', type=click.Path(writable=True, file_okay=False, exists=True))
 def format_genre_tag_cli(path: PathLike | str,
                          old: str = '/',
                          new: str = '|',
                          case: str = None,
                          verbose: bool = False,
-                         eyed3_warn: bool = False):
+                         eyed3_warn: bool = False,
+                         backend: str = 'mutagen'):
     """
-    Command line tool for editing the genre tag for MP3 files.
-    Searches a directory for MP3 files and formats their genre tags.
+    Command line tool for editing the genre tag for MP3 and FLAC files.
+    Searches a directory for MP3 and FLAC files and formats their genre tags.
     Replaces delimiters and converts case.
     """
     logger = get_logger(usefile=False)
     format_multipart_tags(path, 'genre', old, new, case, verbose, logger,
-                          eyed3_warn)
+                          eyed3_warn, backend)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,371 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from os import PathLike, scandir, walk
+from os.path import abspath, basename, exists, isdir, join, splitext
+
+import click
+from wand.image import Image
+
+from audiotagtools.scripts import flac_to_mp3, get_logger, resize
+from audiotagtools.scripts.edit_mp3s import format_dir_multipart_tags
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Fall back to polling if inotify is unavailable
+    INotify = None
+    flags = None
+
+PIPELINE = ['flac-to-mp3', 'format-multipart-tags', 'resize-image']
+"""
+The operations that can be run on a directory, in the order they are applied
+"""
+
+MUSIC_EXTENSIONS = ['.flac', '.mp3']
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.webp']
+IMAGE_NAMES = ['folder', 'cover', 'front']
+
+
+def snapshot(path: PathLike | str):
+    """
+    Creates a comparable record of the files directly inside a directory.
+    Returns None if the directory no longer exists.
+    :param path:
+    :return:
+    """
+    try:
+        entries = [x for x in scandir(path) if x.is_file()]
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    stats = [(x.name, x.stat()) for x in entries]
+    return tuple(sorted((name, st.st_size, st.st_mtime_ns) for name, st in stats))
+
+
+def music_files(snap: tuple | None):
+    """
+    Returns the FLAC and MP3 entries of a snapshot, the files the pipeline takes as input
+    :param snap:
+    :return:
+    """
+    return tuple(x for x in snap or () if splitext(x[0])[1].lower() in MUSIC_EXTENSIONS)
+
+
+def is_music_snapshot(snap: tuple | None):
+    """
+    Checks whether a snapshot contains any FLAC or MP3 files
+    :param snap:
+    :return:
+    """
+    return bool(snap) and any([splitext(x[0])[1].lower() in MUSIC_EXTENSIONS for x in snap])
+
+
+def find_cover_image(path: PathLike | str):
+    """
+    Finds the album cover in a directory.
+    Looks for "folder", "cover" and "front" images, in that order. Returns None if there are none,
+    rather than guessing from other scans (e.g. "back.jpg", "booklet01.jpg").
+    :param path:
+    :return:
+    """
+    images = [x for x in scandir(path) if x.is_file() and splitext(x.name)[1].lower() in IMAGE_EXTENSIONS]
+    images = sorted(images, key=lambda e: e.name)
+    for name in IMAGE_NAMES:
+        for entry in images:
+            if splitext(entry.name)[0].lower() == name:
+                return entry.path
+    return None
+
+
+def is_resized(image: PathLike | str, width: int = 1000):
+    """
+    Checks whether an image exists and is no wider than "width", so it does not need re-encoding
+    :param image:
+    :param width:
+    :return:
+    """
+    if not exists(image):
+        return False
+    with Image(filename=image) as img:
+        return img.width <= width
+
+
+class PollingSource:
+    """
+    Reports directories whose contents changed by rescanning the library at a fixed interval
+    """
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self.snapshots = self.scan()
+
+    def scan(self):
+        snapshots = {}
+        for root, dirs, files in walk(self.path):
+            dirs[:] = [x for x in dirs if not x.startswith('.')]  # Ignore hidden directories
+            snapshots[root] = snapshot(root)
+        return snapshots
+
+    def poll(self):
+        time.sleep(self.interval)
+        snapshots = self.scan()
+        changed = {d for d, s in snapshots.items() if self.snapshots.get(d) != s}
+        self.snapshots = snapshots
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifySource:
+    """
+    Reports directories whose contents changed using inotify watches on every directory in the library
+    """
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self.inotify = INotify()
+        # CLOSE_WRITE rather than MODIFY, which fires for every write() during a copy and overflows the queue
+        self.mask = (flags.CREATE | flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE |
+                     flags.DELETE_SELF)
+        self.watches = {}
+        self.add_tree(path)
+
+    def add_tree(self, path: str):
+        """
+        Adds watches for a directory and all of its non-hidden subdirectories
+        :param path:
+        :return:
+        """
+        added = set()
+        for root, dirs, files in walk(path):
+            dirs[:] = [x for x in dirs if not x.startswith('.')]  # Ignore hidden directories
+            try:
+                wd = self.inotify.add_watch(root, self.mask)
+            except OSError:
+                continue
+            self.watches[wd] = root
+            added.add(root)
+        return added
+
+    def poll(self):
+        changed = set()
+        for event in self.inotify.read(timeout=int(self.interval * 1000)):
+            if event.mask & flags.Q_OVERFLOW:
+                # Events were dropped, so any directory may have changed
+                changed |= self.add_tree(self.path)
+                continue
+            root = self.watches.get(event.wd)
+            if root is None:
+                continue
+            if event.mask & flags.IGNORED:
+                del self.watches[event.wd]
+                continue
+            changed.add(root)
+            if (event.mask & flags.ISDIR and event.mask & (flags.CREATE | flags.MOVED_TO) and
+                    not event.name.startswith('.')):
+                changed |= self.add_tree(join(root, event.name))
+        return changed
+
+    def close(self):
+        self.inotify.close()
+
+
+def run_pipeline(path: str,
+                 pipeline: list[str],
+                 bitrate: int = 256,
+                 inplace: bool = False,
+                 delete: bool = False,
+                 old: str = '/',
+                 new: str = '|',
+                 width: int = 1000,
+                 verbose: bool = False,
+                 logger: logging.Logger = None):
+    """
+    Runs the selected operations on a single directory.
+    Operations that do not apply to the directory's contents are skipped.
+    :param path:
+    :param pipeline:
+    :param bitrate:
+    :param inplace:
+    :param delete:
+    :param old:
+    :param new:
+    :param width:
+    :param verbose:
+    :param logger:
+    :return:
+    """
+    if not logger:
+        logger = get_logger(usefile=False)
+    for operation in [x for x in PIPELINE if x in pipeline]:
+        names = [x.name.lower() for x in scandir(path) if x.is_file()]
+        if operation == 'flac-to-mp3' and any([x.endswith('.flac') for x in names]):
+            flac_to_mp3(path, bitrate, verbose, inplace, delete)
+        elif operation == 'format-multipart-tags' and any([x.endswith('.mp3') for x in names]):
+            format_dir_multipart_tags(path, old, new, verbose, logger)
+        elif operation == 'resize-image':
+            image = find_cover_image(path)
+            if image and not is_resized(join(path, 'folder.jpg'), width):
+                if verbose:
+                    logger.info(f'Resizing "{image}"...')
+                resize(image, width, join(path, 'folder'))
+
+
+def watch_library(path: PathLike | str,
+                  pipeline: list[str] = None,
+                  settle: float = 10.0,
+                  interval: float = 5.0,
+                  jobs: int = 2,
+                  polling: bool = False,
+                  initial: bool = False,
+                  verbose: bool = False,
+                  logger: logging.Logger = None,
+                  stop: threading.Event = None,
+                  **options):
+    """
+    Watches a library for new or changed directories and runs a pipeline of operations on each of them.
+    A directory is only processed once its contents have stopped changing for "settle" seconds.
+    Uses inotify if "inotify_simple" is installed, otherwise polls the library every "interval" seconds.
+    :param path:
+    :param pipeline: Operations to run. See PIPELINE.
+    :param settle: Seconds a directory must be unchanged before it is processed.
+    :param interval: Seconds between checks for changes.
+    :param jobs: Maximum number of directories processed at once.
+    :param polling: Poll for changes, even if inotify is available.
+    :param initial: Process the directories already in the library on startup.
+    :param verbose:
+    :param logger:
+    :param stop: Stops watching once set.
+    :param options: Passed to run_pipeline.
+    :return:
+    """
+    if not logger:
+        logger = get_logger(usefile=False)
+    if pipeline is None:
+        pipeline = PIPELINE
+    path = abspath(path)
+    if polling or INotify is None:
+        logger.info(f'Polling "{path}" for changes every {interval} seconds...')
+        source = PollingSource(path, interval)
+    else:
+        logger.info(f'Watching "{path}" for changes...')
+        source = InotifySource(path, interval)
+
+    pending: dict[str, float] = {}  # Directory -> time of last observed change
+    seen: dict[str, tuple] = {}  # Directory -> last observed snapshot
+    done: dict[str, tuple] = {}  # Directory -> snapshot taken after processing
+    dispatched: dict[str, tuple] = {}  # Directory -> snapshot the running pipeline started from
+    running: dict[str, Future] = {}
+    for root, dirs, files in walk(path):
+        dirs[:] = [x for x in dirs if not x.startswith('.')]  # Ignore hidden directories
+        if initial:
+            pending[root] = 0.0
+        else:
+            done[root] = snapshot(root)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+    try:
+        while not (stop and stop.is_set()):
+            now = time.monotonic()
+            for d in source.poll():
+                pending[d] = now
+
+            # Record results of finished directories
+            for d, future in list(running.items()):
+                if future.done():
+                    del running[d]
+                    error = future.exception()
+                    if error:
+                        logger.warning(f'Exception {error.__class__}: {error}.\nSkipping "{d}".')
+                    snap = snapshot(d)
+                    if music_files(snap) != music_files(dispatched.pop(d)):
+                        # Tracks arrived or changed while the pipeline ran; process the directory again once it settles.
+                        # Tracks the pipeline edited itself cause one more pass, which finds nothing left to change.
+                        pending[d] = time.monotonic()
+                        seen.pop(d, None)
+                    else:
+                        done[d] = snap
+                        logger.info(f'Finished "{d}".')
+
+            # Dispatch directories that have settled
+            now = time.monotonic()
+            for d, changed in list(pending.items()):
+                if d in running or now - changed < settle:
+                    continue
+                snap = snapshot(d)
+                if snap is None:
+                    del pending[d]
+                    seen.pop(d, None)
+                    done.pop(d, None)
+                elif snap != seen.get(d):
+                    # Files are still being copied
+                    seen[d] = snap
+                    pending[d] = now
+                else:
+                    del pending[d]
+                    if snap != done.get(d) and is_music_snapshot(snap) and not basename(d).startswith('.'):
+                        logger.info(f'Processing "{d}"...')
+                        dispatched[d] = snap
+                        running[d] = executor.submit(run_pipeline, d, pipeline, verbose=verbose, logger=logger,
+                                                     **options)
+    except KeyboardInterrupt:
+        logger.info('Stopping. Waiting for running directories to finish...')
+    finally:
+        source.close()
+        executor.shutdown(wait=True)
+
+
+@click.command()
+@click.option('-p',
+              '--pipeline',
+              type=click.Choice(PIPELINE),
+              multiple=True,
+              default=PIPELINE,
+              show_default=True,
+              help='Operation to run on each new directory. May be given more than once.')
+@click.option('-s', '--settle', default=10.0, show_default=True,
+              help='Seconds a directory must be unchanged before it is processed.')
+@click.option('-t', '--interval', default=5.0, show_default=True, help='Seconds between checks for changes.')
+@click.option('-j', '--jobs', default=2, show_default=True, help='Maximum number of directories processed at once.')
+@click.option('--polling', is_flag=True, help='Poll for changes instead of using inotify.')
+@click.option('--initial', is_flag=True, help='Also process the directories already in the library.')
+@click.option('-b', '--bitrate', default=256, help='Bitrate of converted MP3 files. default: 256')
+@click.option('-i', '--inplace', is_flag=True, help='Replace FLAC files with converted MP3 files.')
+@click.option('-d', '--delete', is_flag=True, help='Delete FLAC files after conversion. Automatically sets --inplace.')
+@click.option('-o', '--old', type=click.STRING, default='/', help='Old tag delimiter.')
+@click.option('-n', '--new', type=click.STRING, default='|', help='New tag delimiter.')
+@click.option('-w', '--width', default=1000, help='Width of resized cover images. default: 1000')
+@click.option('-v', '--verbose', is_flag=True, help='Verbose mode.')
+@click.argument('path', type=click.Path(exists=True, file_okay=False, dir_okay=True, writable=True))
+def watch_library_cli(path: PathLike | str,
+                      pipeline: tuple[str],
+                      settle: float,
+                      interval: float,
+                      jobs: int,
+                      polling: bool,
+                      initial: bool,
+                      bitrate: int,
+                      inplace: bool,
+                      delete: bool,
+                      old: str,
+                      new: str,
+                      width: int,
+                      verbose: bool):
+    """
+    A command line tool for processing new albums as they are added to a library.
+    Watches a directory and its subdirectories, and runs the selected operations on each directory
+    once it has finished changing.
+    """
+    logger = get_logger(usefile=False)
+    if exists(path) and isdir(path):
+        watch_library(path, list(pipeline), settle, interval, jobs, polling, initial, verbose, logger,
+                      bitrate=bitrate, inplace=inplace, delete=delete, old=old, new=new, width=width)
+    else:
+        logger.warning(f'"{path}" is not a directory.')
+
+
+if __name__ == '__main__':
+    pass
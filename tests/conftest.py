@@ -0,0 +1,32 @@
+import struct
+
+import pytest
+
+
+def build_flac(path):
+    """
+    Writes a minimal FLAC file: the "fLaC" marker and a STREAMINFO block with no audio frames
+    """
+    streaminfo = struct.pack('>HH', 4096, 4096) + b'\x00' * 6
+    streaminfo += ((44100 << 44) | (1 << 41) | (15 << 36)).to_bytes(8, 'big') + b'\x00' * 16
+    with open(path, 'wb') as f:
+        f.write(b'fLaC' + bytes([0x80]) + len(streaminfo).to_bytes(3, 'big') + streaminfo)
+
+
+def build_mp3(path):
+    """
+    Writes a minimal MP3 file: a few silent MPEG-1 Layer III frames (128 kbps, 44.1 kHz)
+    """
+    frame = b'\xff\xfb\x90\x64' + b'\x00' * 413
+    with open(path, 'wb') as f:
+        f.write(frame * 10)
+
+
+@pytest.fixture
+def make_flac():
+    return build_flac
+
+
+@pytest.fixture
+def make_mp3():
+    return build_mp3
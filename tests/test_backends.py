@@ -0,0 +1,61 @@
+import mutagen
+import pytest
+from mutagen.id3 import ID3, TPE1, TSOP, TCON
+
+from audiotagtools.scripts.backends import TagBackend, MutagenBackend, id3_version
+from audiotagtools.scripts.strings import format_multipart_tags
+
+
+def tag_mp3(path, version, **frames):
+    tags = ID3()
+    for frame in frames.values():
+        tags.add(frame)
+    tags.save(path, v2_version=version)
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        TagBackend()
+
+
+def test_formats_flac(tmp_path, make_flac):
+    path = tmp_path / '01.flac'
+    make_flac(path)
+    audio = mutagen.File(path, easy=True)
+    audio.add_tags()
+    audio['genre'] = 'rock/pop'
+    audio.save()
+    format_multipart_tags(tmp_path, 'genre', case='title', backend='mutagen')
+    assert mutagen.File(path, easy=True)['genre'] == ['Rock|Pop']
+
+
+def test_eyed3_skips_flac(tmp_path, make_flac):
+    path = tmp_path / '01.flac'
+    make_flac(path)
+    before = path.read_bytes()
+    format_multipart_tags(tmp_path, 'genre', case='title', backend='eyed3')
+    assert path.read_bytes() == before
+
+
+def test_keeps_id3v24_frames(tmp_path, make_mp3):
+    path = tmp_path / '01.mp3'
+    make_mp3(path)
+    tag_mp3(path, 4, artist=TPE1(encoding=3, text=['Foo/Bar']), sort=TSOP(encoding=3, text=['Bar, Foo']))
+    format_multipart_tags(tmp_path, 'artist', case=None)
+    tags = ID3(path)
+    assert tags.version[1] == 4
+    assert tags['TPE1'].text == ['Foo|Bar']
+    assert tags['TSOP'].text == ['Bar, Foo']
+
+
+def test_keeps_id3v23(tmp_path, make_mp3):
+    path = tmp_path / '01.mp3'
+    make_mp3(path)
+    tag_mp3(path, 3, genre=TCON(encoding=1, text=['rock/pop']))
+    assert id3_version(path) == 3
+    backend = MutagenBackend()
+    audio = backend.load(path)
+    backend.set(audio, 'genre', 'Rock|Pop')
+    backend.save(audio)
+    assert id3_version(path) == 3
+    assert ID3(path)['TCON'].text == ['Rock|Pop']
@@ -0,0 +1,76 @@
+import json
+
+import mutagen
+import pytest
+from mutagen.id3 import ID3, TPE1
+
+from audiotagtools.scripts.bulk import export_tags, import_tags, read_tags, write_tags
+
+
+@pytest.fixture
+def library(tmp_path, make_flac, make_mp3):
+    root = tmp_path / 'library'
+    (root / 'album').mkdir(parents=True)
+    flac, mp3 = root / 'album' / '01.flac', root / 'album' / '02.mp3'
+    make_flac(flac)
+    make_mp3(mp3)
+    for path, tags in ((flac, {'title': ['X; Y'], 'genre': ['Rock', 'Pop'], 'artist': ['[Live]']}),
+                       (mp3, {'title': ['Foo; Bar'], 'artist': ['A/B'], 'genre': ['Rock', 'Pop']})):
+        audio = mutagen.File(path, easy=True)
+        audio.add_tags()
+        audio.update(tags)
+        audio.save()
+    return root
+
+
+@pytest.mark.parametrize('name', ['tags.csv', 'tags.jsonl'])
+def test_round_trip_saves_nothing(library, tmp_path, name):
+    before = {x: read_tags(library / 'album' / x) for x in ('01.flac', '02.mp3')}
+    output = tmp_path / name
+    assert export_tags(library, output) == 2
+    assert import_tags(library, output) == 0
+    assert {x: read_tags(library / 'album' / x) for x in ('01.flac', '02.mp3')} == before
+
+
+def test_import_saves_edited_rows(library, tmp_path):
+    output = tmp_path / 'tags.jsonl'
+    export_tags(library, output)
+    rows = [json.loads(x) for x in output.read_text().splitlines()]
+    rows[0]['tags']['genre'] = ['Jazz']
+    edited = tmp_path / 'edited.jsonl'
+    edited.write_text(''.join(json.dumps(x) + '\n' for x in rows))
+    assert import_tags(library, edited, original=output) == 1
+    assert read_tags(library / 'album' / '01.flac')['genre'] == ['Jazz']
+
+
+def test_export_skips_unreadable_files(library, tmp_path):
+    (library / 'album' / '03.flac').write_bytes(b'fLaC\x00')
+    output = tmp_path / 'tags.csv'
+    assert export_tags(library, output) == 2
+    assert not (tmp_path / 'tags.csv.tmp').exists()
+
+
+def test_multiple_values_on_id3v23_are_written_once(tmp_path, make_mp3):
+    path = tmp_path / '01.mp3'
+    make_mp3(path)
+    tags = ID3()
+    tags.add(TPE1(encoding=1, text=['A']))
+    tags.save(path, v2_version=3)
+    assert write_tags(path, {'artist': ['A', 'B']})
+    assert not write_tags(path, {'artist': ['A', 'B']})
+    assert read_tags(path)['artist'] == ['A/B']
+
+
+def test_import_skips_duplicate_and_outside_rows(library, tmp_path):
+    before = read_tags(library / 'album' / '01.flac')
+    source = tmp_path / 'edited.jsonl'
+    rows = [
+        {'path': 'album/01.flac', 'tags': {'genre': ['Jazz']}},
+        {'path': 'album/../album/01.flac', 'tags': {'genre': ['Blues']}},
+        {'path': '../outside.flac', 'tags': {'genre': ['Jazz']}},
+        {'path': 'album/02.mp3', 'tags': {'genre': ['Jazz']}},
+    ]
+    source.write_text(''.join(json.dumps(x) + '\n' for x in rows))
+    assert import_tags(library, source) == 1
+    assert read_tags(library / 'album' / '01.flac') == before
+    assert read_tags(library / 'album' / '02.mp3')['genre'] == ['Jazz']
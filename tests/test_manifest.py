@@ -0,0 +1,131 @@
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from audiotagtools.scripts import manifest
+from audiotagtools.scripts.manifest import Lease, create_manifest, drain_manifest, manifest_status, read_manifest
+
+
+def record_operation(path, operation, **options):
+    """
+    Stands in for the real operations: appends the worker's pid to a file in the unit's directory
+    """
+    time.sleep(0.05)
+    with open(os.path.join(path, 'processed'), 'a') as f:
+        f.write(f'{os.getpid()}\n')
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / 'library'
+    for i in range(12):
+        (root / f'album{i:02d}').mkdir(parents=True)
+        (root / f'album{i:02d}' / '01.flac').touch()
+    return root
+
+
+def expire(lock):
+    with open(lock, 'w') as f:
+        json.dump({'worker': 'crashed', 'token': 'crashed'}, f)
+    os.utime(lock, (0, 0))
+
+
+def test_workers_share_manifest(library, tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, 'run_operation', record_operation)
+    path = tmp_path / 'manifest'
+    assert create_manifest(library, path) == 12
+    expire(path / 'locks' / '000003.lock')  # Left behind by a crashed worker
+
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=drain_manifest, args=(str(path), 'flac-to-mp3', 1.0, 0.1)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    for i in range(12):
+        assert len((library / f'album{i:02d}' / 'processed').read_text().split()) == 1
+    status = manifest_status(path)
+    assert len(status['finished']) == 12
+    assert not status['failed'] and not status['claimed'] and not status['remaining']
+
+
+def test_live_lease_is_not_taken_over(tmp_path):
+    lock = str(tmp_path / 'unit.lock')
+    first, second = Lease(lock, 'first', 5.0), Lease(lock, 'second', 5.0)
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    lock = str(tmp_path / 'unit.lock')
+    expire(lock)
+    claim = Lease(lock, 'worker', 5.0)
+    assert claim.acquire()
+    claim.release()
+    assert not os.path.exists(lock)
+
+
+def test_lease_lost_when_taken_over(tmp_path):
+    lock = str(tmp_path / 'unit.lock')
+    claim = Lease(lock, 'worker', 0.3)
+    assert claim.acquire()
+    expire(lock)  # Another worker's claim replaces ours
+    time.sleep(0.5)
+    assert claim.lost
+    claim.release()
+    assert os.path.exists(lock)  # The other worker's lock is left alone
+
+
+def test_units_resolve_against_root(library, tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, 'run_operation', record_operation)
+    path = tmp_path / 'manifest'
+    create_manifest(library, path)
+    assert {x['path'] for x in read_manifest(path)['units']} == {f'album{i:02d}' for i in range(12)}
+    mounted = tmp_path / 'mounted'
+    library.rename(mounted)  # The library as another node sees it
+    assert drain_manifest(path, 'flac-to-mp3', 1.0, 0.1, root=mounted) == 12
+    for i in range(12):
+        assert (mounted / f'album{i:02d}' / 'processed').exists()
+
+
+def test_lost_lease_stops_operation(library, tmp_path):
+    lock = str(tmp_path / 'unit.lock')
+    claim = Lease(lock, 'worker', 5.0)
+    assert claim.acquire()
+    expire(lock)  # Taken over before the renewal thread notices
+    manifest.run_operation(str(library / 'album00'), 'flac-to-mp3', lease=claim)
+    assert claim.lost
+    assert os.listdir(library / 'album00') == ['01.flac'] and not (library / 'album00 (MP3)').exists()
+    claim.release()
+
+
+def test_put_back_keeps_live_lock(tmp_path, monkeypatch):
+    lock = str(tmp_path / 'unit.lock')
+    owner = Lease(lock, 'owner', 5.0)
+    assert owner.acquire()
+    other = Lease(lock, 'other', 5.0)
+
+    # Another worker claims the unit while this one has the lock out of place
+    link = os.link
+
+    def claim_then_link(src, dst):
+        with open(dst, 'w') as f:
+            json.dump({'worker': 'third', 'token': 'third'}, f)
+        link(src, dst)
+
+    monkeypatch.setattr(manifest.os, 'link', claim_then_link)
+    monkeypatch.setattr(other, '_expired', lambda path: path == lock)
+    assert not other._break_stale()
+    stale = [x for x in os.listdir(tmp_path) if x.endswith('.stale')]
+    assert len(stale) == 1  # The owner's lock is set aside, not deleted
+    assert json.load(open(tmp_path / stale[0]))['token'] == owner.token
+    assert not owner.held()
+    owner.release()
@@ -0,0 +1,50 @@
+import numpy as np
+import pydub.silence
+import pytest
+from pydub import AudioSegment
+
+from audiotagtools.scripts.silence import detect_silence, measure_silence, trim_silence
+
+
+def noisy_segment(seed, frame_rate=44100, channels=2, seconds=6):
+    """
+    Builds a segment of noise bursts at different levels, with a length that is not a whole number of milliseconds
+    """
+    rng = np.random.default_rng(seed)
+    frames = frame_rate * seconds + int(rng.integers(1, frame_rate // 1000))
+    levels = np.repeat(rng.choice([3.0, 40.0, 300.0, 8000.0], size=4 * seconds + 1), frame_rate // 4)[:frames]
+    samples = (rng.normal(0, 1, (frames, channels)) * levels[:, None]).clip(-32768, 32767).astype(np.int16)
+    return AudioSegment(samples.tobytes(), frame_rate=frame_rate, sample_width=2, channels=channels)
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('frame_rate', [44100, 48000, 22050])
+def test_matches_pydub(seed, frame_rate):
+    segment = noisy_segment(seed, frame_rate)
+    for thresh in (-50, -40):
+        assert detect_silence(segment, 700, thresh, 1) == pydub.silence.detect_silence(segment, 700, thresh, 1)
+
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('window', [7, 10])
+def test_ranges_cover_min_silence_len(seed, window):
+    segment = noisy_segment(seed) + AudioSegment.silent(3, frame_rate=44100)  # Not a whole number of windows
+    expected = pydub.silence.detect_silence(segment, 1005, -50, 1)
+    for start, end in detect_silence(segment, 1005, -50, window):
+        assert end - start >= 1005
+        assert any([s < end and start < e for s, e in expected])
+
+def test_trim_keeps_padding():
+    tone = AudioSegment.silent(3000) + noisy_segment(0, seconds=2).apply_gain(20) + AudioSegment.silent(2000)
+    report = measure_silence(tone)
+    assert report['leading'] >= 2900 and report['trailing'] >= 1900
+    trimmed, _ = trim_silence(tone, padding=200)
+    assert len(trimmed) == len(tone) - (report['leading'] - 200) - (report['trailing'] - 200)
+
+
+def test_silent_segment_is_not_trimmed():
+    segment = AudioSegment.silent(3000)
+    trimmed, report = trim_silence(segment)
+    assert len(trimmed) == 3000
+    assert report['leading'] == report['trailing'] == 3000
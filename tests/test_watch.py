@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from audiotagtools.scripts import watch
+from audiotagtools.scripts.watch import find_cover_image, watch_library
+
+SETTLE = 0.3
+INTERVAL = 0.05
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """
+    Replaces run_pipeline with a stub that records each call and writes a file that is not a pipeline input
+    """
+    calls = []
+
+    def run_pipeline(path, pipeline, **options):
+        calls.append((path, time.monotonic()))
+        with open(f'{path}/pipeline.log', 'a') as f:
+            f.write('processed\n')
+
+    monkeypatch.setattr(watch, 'run_pipeline', run_pipeline)
+    return calls
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    """
+    Runs watch_library on a temporary library in a thread, polling for changes
+    """
+    library = tmp_path / 'library'
+    library.mkdir()
+    stop = threading.Event()
+    thread = threading.Thread(target=watch_library, args=(library,),
+                              kwargs={'settle': SETTLE, 'interval': INTERVAL, 'polling': True, 'stop': stop})
+    thread.start()
+    time.sleep(INTERVAL * 2)
+    yield library
+    stop.set()
+    thread.join(timeout=10)
+
+
+def wait_for(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(INTERVAL)
+    return False
+
+
+def test_new_album_is_processed_once(watcher, runs):
+    album = watcher / 'album'
+    album.mkdir()
+    (album / '01.mp3').write_bytes(b'a')
+    assert wait_for(lambda: len(runs) == 1)
+    time.sleep(SETTLE * 4)  # The stub's pipeline.log must not trigger another run
+    assert [x[0] for x in runs] == [str(album)]
+
+
+def test_processing_waits_for_copy_to_finish(watcher, runs):
+    album = watcher / 'album'
+    album.mkdir()
+    for i in range(8):
+        (album / f'{i:02d}.mp3').write_bytes(b'a')
+        time.sleep(SETTLE / 2)
+        assert not runs
+    copied = time.monotonic()
+    assert wait_for(lambda: len(runs) == 1)
+    assert runs[0][1] - copied >= SETTLE
+    time.sleep(SETTLE * 4)
+    assert len(runs) == 1
+
+
+def test_tracks_arriving_during_processing_are_processed(watcher, monkeypatch):
+    calls = []
+
+    def slow_pipeline(path, pipeline, **options):
+        calls.append(path)
+        if len(calls) == 1:
+            with open(f'{path}/02.mp3', 'wb') as f:  # A track lands mid-run
+                f.write(b'b')
+
+    monkeypatch.setattr(watch, 'run_pipeline', slow_pipeline)
+    album = watcher / 'album'
+    album.mkdir()
+    (album / '01.mp3').write_bytes(b'a')
+    assert wait_for(lambda: len(calls) == 2)
+    time.sleep(SETTLE * 4)
+    assert len(calls) == 2
+
+
+def test_existing_albums_are_ignored(tmp_path, runs):
+    library = tmp_path / 'library'
+    (library / 'album').mkdir(parents=True)
+    (library / 'album' / '01.mp3').write_bytes(b'a')
+    stop = threading.Event()
+    thread = threading.Thread(target=watch_library, args=(library,),
+                              kwargs={'settle': SETTLE, 'interval': INTERVAL, 'polling': True, 'stop': stop})
+    thread.start()
+    time.sleep(SETTLE * 4)
+    stop.set()
+    thread.join(timeout=10)
+    assert not runs
+
+
+@pytest.mark.parametrize('names, expected', [
+    (['back.jpg', 'booklet01.jpg'], None),
+    (['back.jpg', 'Cover.png'], 'Cover.png'),
+    (['front.jpg', 'cover.jpg', 'folder.jpg'], 'folder.jpg'),
+])
+def test_find_cover_image(tmp_path, names, expected):
+    for name in names:
+        (tmp_path / name).write_bytes(b'')
+    result = find_cover_image(tmp_path)
+    assert result == (str(tmp_path / expected) if expected else None)